@@ -4,10 +4,10 @@ import argparse
 import datetime
 import locale
 import logging
-from collections import defaultdict
-from typing import cast, DefaultDict, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
 
-from .events import DailyEvent
+from .events import DayBucket
 from .generate import (
     initialize_document,
     generate_links,
@@ -16,8 +16,6 @@ from .generate import (
 )
 from .holidays import collect_french_holidays
 
-from fpdf import FPDF
-
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.StreamHandler())
 LOGGER.setLevel(logging.INFO)
@@ -78,31 +76,38 @@ if __name__ == "__main__":
 
     LOGGER.info(f"Generation of calendar for {year}")
 
-    doc = initialize_document(year)
-    links_mapping = generate_links(doc, year)
-    events: Dict[str, Dict[str, List[DailyEvent]]] = defaultdict(
-        lambda: defaultdict(list)
-    )
-    if locale.getlocale()[0] == "fr_FR" and (
-        args["school_zone"] or args["bank_holidays"]
-    ):
-        LOGGER.info("Collecting French holidays")
-        collect_french_holidays(
-            year,
-            cast(DefaultDict[str, DefaultDict[str, List[DailyEvent]]], events),
-            school_zone=args["school_zone"],
-            bank_zone=args["bank_holidays"],
-        )
-
-    add_year_page(doc, year, links_mapping, events)
+    events: Dict[datetime.date, DayBucket] = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # holidays are collected in a worker thread; Both phases are
+        # Python code holding the GIL, so they interleave rather than
+        # run in parallel
+        holidays = None
+        if locale.getlocale()[0] == "fr_FR" and (
+            args["school_zone"] or args["bank_holidays"]
+        ):
+            LOGGER.info("Collecting French holidays")
+            holidays = executor.submit(
+                collect_french_holidays,
+                year,
+                events,
+                school_zone=args["school_zone"],
+                bank_zone=args["bank_holidays"],
+            )
+
+        doc = initialize_document(year)
+        table = generate_links(doc, year)
+
+        if holidays is not None:
+            holidays.result()
+
+    add_year_page(doc, table, events)
 
     time_block_line_width = args["linewidth"]
     time_block_line_color = args["linecolor"]
 
     add_months_pages(
         doc,
-        year,
-        links_mapping,
+        table,
         events,
         time_block_line_width=time_block_line_width,
         time_block_line_color=time_block_line_color,
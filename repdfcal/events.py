@@ -1,5 +1,5 @@
 import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -8,5 +8,15 @@ class DailyEvent:
     duration: int
     title: str
 
-    def is_holiday(self) -> bool:
-        return True
+
+@dataclass
+class DayBucket:
+    all_day_titles: list[str] = field(default_factory=list)
+    all_day_text: str = ""
+    timed: list[DailyEvent] = field(default_factory=list)
+    has_holiday: bool = False
+
+    def add_all_day(self, title: str, *, holiday: bool = False) -> None:
+        self.all_day_titles.append(title)
+        self.all_day_text = "\n".join(self.all_day_titles)
+        self.has_holiday = self.has_holiday or holiday
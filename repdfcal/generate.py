@@ -1,11 +1,14 @@
 """Everything about PDF generation."""
 
+import calendar
 import logging
 import locale
 import datetime
+import functools
+from dataclasses import dataclass, field
+from typing import cast
 
-from .events import DailyEvent
-from .holidays import collect_french_holidays
+from .events import DayBucket
 
 import fpdf
 from fpdf import FPDF
@@ -42,46 +45,60 @@ MONTH_COLOR: list[tuple[int, int, int]] = [
 
 HOLYDAY_COLOR = (180, 180, 180)
 
-locale.setlocale(locale.LC_ALL, "")
-# propagate OS locale
 
-DAYS: list[str] = []
-FULLDAYS: list[str] = []
-
-for abdayid, dayid in (
-    (locale.ABDAY_2, locale.DAY_2),
-    (locale.ABDAY_3, locale.DAY_3),
-    (locale.ABDAY_4, locale.DAY_4),
-    (locale.ABDAY_5, locale.DAY_5),
-    (locale.ABDAY_6, locale.DAY_6),
-    (locale.ABDAY_7, locale.DAY_7),
-    (locale.ABDAY_1, locale.DAY_1),
-):
-    DAYS.append(locale.nl_langinfo(abdayid))
-    FULLDAYS.append(locale.nl_langinfo(dayid))
-
-MONTHS: list[str] = [
-    "None",
-]
-
-for monthid in (
-    locale.MON_1,
-    locale.MON_2,
-    locale.MON_3,
-    locale.MON_4,
-    locale.MON_5,
-    locale.MON_6,
-    locale.MON_7,
-    locale.MON_8,
-    locale.MON_9,
-    locale.MON_10,
-    locale.MON_11,
-    locale.MON_12,
-):
-    MONTHS.append(locale.nl_langinfo(monthid))
+@functools.cache
+def _load_locale_names(
+    locale_name: tuple[str | None, str | None],
+) -> tuple[list[str], list[str], list[str]]:
+    """Abbreviated day names, day names and month names.
+
+    Names are read from the current locale, whose name is only used as
+    cache key. Weeks start on monday, and month names have a
+    placeholder for month 0."""
+    days: list[str] = []
+    fulldays: list[str] = []
+
+    for abdayid, dayid in (
+        (locale.ABDAY_2, locale.DAY_2),
+        (locale.ABDAY_3, locale.DAY_3),
+        (locale.ABDAY_4, locale.DAY_4),
+        (locale.ABDAY_5, locale.DAY_5),
+        (locale.ABDAY_6, locale.DAY_6),
+        (locale.ABDAY_7, locale.DAY_7),
+        (locale.ABDAY_1, locale.DAY_1),
+    ):
+        days.append(locale.nl_langinfo(abdayid))
+        fulldays.append(locale.nl_langinfo(dayid))
+
+    months: list[str] = [
+        "None",
+    ]
+
+    for monthid in (
+        locale.MON_1,
+        locale.MON_2,
+        locale.MON_3,
+        locale.MON_4,
+        locale.MON_5,
+        locale.MON_6,
+        locale.MON_7,
+        locale.MON_8,
+        locale.MON_9,
+        locale.MON_10,
+        locale.MON_11,
+        locale.MON_12,
+    ):
+        months.append(locale.nl_langinfo(monthid))
+
+    return days, fulldays, months
 
 
 def initialize_document(year: int) -> FPDF:
+    if int(fpdf.FPDF_VERSION.split(".")[0]) < 2:
+        # PyFPDF shares the fpdf package name but concatenates the
+        # document body as a string
+        raise RuntimeError(f"fpdf2 is required, found fpdf {fpdf.FPDF_VERSION}")
+
     doc = FPDF(
         orientation="portrait",
         unit="mm",
@@ -97,53 +114,210 @@ def initialize_document(year: int) -> FPDF:
     return doc
 
 
-def generate_links(doc: FPDF, year: int) -> dict[str, int]:
+@dataclass
+class DayEntry:
+    """A day of the calendar with its cell in month overviews."""
+
+    date: datetime.date
+    day: int
+    label: str
+    weekday: int
+    week: int
+    link: int
+
+
+@dataclass
+class MonthLayout:
+    """A month of the calendar, shared by all its overviews."""
+
+    mon: int
+    name: str
+    header: str
+    color: tuple[int, int, int]
+    link: int
+    days: list[DayEntry]
+
+
+@dataclass
+class CalendarTable:
+    """Dates, names and links of a year, computed once.
+
+    A table belongs to the document it was generated for, and also
+    caches the wrapping of texts inserted in that document."""
+
+    year: int
+    day_names: list[str]
+    full_day_names: list[str]
+    year_link: int
+    months: list[MonthLayout]
+    wrapped_lines: dict[tuple[object, ...], list[str]] = field(default_factory=dict)
+
+
+def generate_links(doc: FPDF, year: int) -> CalendarTable:
     """Create links for every day and month of the given year.
 
-    Return a mapping from day or month ids to link numbers.
+    Return a table of the months and days of the year with their
+    link numbers.
 
     As a side-effect, creates title page.
     """
     doc.add_page()
 
-    links_mapping: dict[str, int] = {}
+    days, fulldays, months = _load_locale_names(locale.getlocale(locale.LC_TIME))
 
     # link for year page
-    links_mapping["%04d" % (year)] = doc.add_link()
+    table = CalendarTable(
+        year=year,
+        day_names=days,
+        full_day_names=fulldays,
+        year_link=doc.add_link(),
+        months=[],
+    )
+
+    weekday = datetime.date(year, 1, 1).weekday()
 
     for mon in range(1, 12 + 1):
         # link for month overview page
-        links_mapping["%04d-%02d" % (year, mon)] = doc.add_link()
+        layout = MonthLayout(
+            mon=mon,
+            name=months[mon],
+            header="%s %04d" % (months[mon], year),
+            color=MONTH_COLOR[mon],
+            link=doc.add_link(),
+            days=[],
+        )
 
         # links for day page
-        for day in range(1, 31 + 1):
-            links_mapping["%04d-%02d-%02d" % (year, mon, day)] = doc.add_link()
+        week = 0
+        for day in range(1, calendar.monthrange(year, mon)[1] + 1):
+            if weekday == 0 and day != 1:
+                week += 1
+
+            layout.days.append(
+                DayEntry(
+                    date=datetime.date(year, mon, day),
+                    day=day,
+                    label=str(day),
+                    weekday=weekday,
+                    week=week,
+                    link=doc.add_link(),
+                )
+            )
+            weekday = (weekday + 1) % 7
+        table.months.append(layout)
 
     doc.set_font(FONT, "B", 40)
     doc.set_xy(0, 0)
     doc.cell(text="%04d" % (year), align="C", w=PAGE_WIDTH, h=20)
-    doc.set_link(links_mapping["%04d" % (year)])
+    doc.set_link(table.year_link)
+
+    return table
+
+
+def __stroke_lines(
+    doc: FPDF, lines: list[tuple[float, float, float, float]]
+) -> None:
+    """Draw lines with current draw color and line width.
+
+    Equivalent to calling ``doc.line()`` for each line, but the lines
+    are written to the content stream as a single path."""
+    if not lines:
+        return
+
+    k = doc.k
+    h = doc.h
+    doc._out(
+        " ".join(
+            f"{x1 * k:.2f} {(h - y1) * k:.2f} m {x2 * k:.2f} {(h - y2) * k:.2f} l"
+            for x1, y1, x2, y2 in lines
+        )
+        + " S"
+    )
+
 
-    return links_mapping
+def __paint_rects(
+    doc: FPDF, rects: list[tuple[float, float, float, float, str]]
+) -> None:
+    """Paint rectangles, each with its own PDF painting operator.
+
+    Use ``"S"`` to stroke borders with current draw color and line
+    width, ``"f"`` to fill with current fill color. Equivalent to
+    calling ``doc.rect()`` for each rectangle in order, but the
+    rectangles are written to the content stream at once."""
+    if not rects:
+        return
+
+    k = doc.k
+    h = doc.h
+    doc._out(
+        " ".join(
+            f"{x * k:.2f} {(h - y) * k:.2f} {w * k:.2f} {-rh * k:.2f} re {operator}"
+            for x, y, w, rh, operator in rects
+        )
+    )
+
+
+def __insert_text(
+    doc: FPDF,
+    table: CalendarTable,
+    text: str,
+    *,
+    w: float,
+    h: float,
+    align: str,
+) -> None:
+    """Insert text at current position, wrapped to the given width.
+
+    Renders like ``doc.multi_cell()``, but wrapped lines are cached in
+    the calendar table of the document, per text, font settings, cell
+    margin and width; Single lines that fit are not wrapped at all."""
+    key = (
+        text,
+        doc.current_font,
+        doc.font_style,
+        doc.font_size_pt,
+        doc.char_spacing,
+        doc.font_stretching,
+        doc.c_margin,
+        w,
+    )
+    lines = table.wrapped_lines.get(key)
+    if lines is None:
+        if "\n" not in text and doc.get_string_width(text) <= w - 2 * doc.c_margin:
+            lines = [text]
+        else:
+            lines = cast(
+                list[str],
+                doc.multi_cell(
+                    w=w, h=h, text=text, align=align, dry_run=True, output="LINES"
+                ),
+            )
+        table.wrapped_lines[key] = lines
+
+    x = doc.get_x()
+    y = doc.get_y()
+    for line in lines:
+        doc.set_xy(x, y)
+        doc.cell(w=w, h=h, text=line, align=align)
+        y += h
 
 
 def __insert_month_overview(
     doc: FPDF,
-    year: int,
-    mon: int,
-    links: dict[str, int],
-    events: dict[str, dict[str, list[DailyEvent]]],
+    table: CalendarTable,
+    layout: MonthLayout,
+    events: dict[datetime.date, DayBucket],
     *,
     highlighted_day: int | None,
     highlighted_holidays: bool,
     size: int,
     x: int,
     y: int,
-    day_font=None,
-    border=False,
-    full_page=False,
-    display_year=True,
-    ysize=None,
+    day_font: float | None = None,
+    border: bool = False,
+    full_page: bool = False,
+    display_year: bool = True,
+    ysize: float | None = None,
 ):
     """An overview on the given month.
 
@@ -157,17 +331,17 @@ def __insert_month_overview(
 
     doc.set_font(FONT, "B", 2 * size)
     doc.set_text_color(255)
-    doc.set_fill_color(*(MONTH_COLOR[mon]))
+    doc.set_fill_color(*layout.color)
 
     if display_year:
-        header = "%s %04d" % (MONTHS[mon], year)
+        header = layout.header
     else:
-        header = MONTHS[mon]
+        header = layout.name
 
     if full_page:
-        link = links["%04d" % (year)]
+        link = table.year_link
     else:
-        link = links["%04d-%02d" % (year, mon)]
+        link = layout.link
 
     doc.set_xy(x, y)
     doc.cell(w=7 * size, h=1.5 * size, text=header, align="C", fill=True, link=link)
@@ -183,106 +357,88 @@ def __insert_month_overview(
         doc.cell(
             h=size * 0.5,
             w=size,
-            text=DAYS[weekday],
+            text=table.day_names[weekday],
             fill=True,
             align="C",
         )
 
-    week = 0
     y += int(size * 0.5)
 
     # draw the table for days of the month
     doc.set_text_color(0)
+    doc.set_fill_color(*HOLYDAY_COLOR)
+
+    weekday_x = [x + weekday * size for weekday in range(0, 7)]
+    day_h = day_font / 2 + 1.5
+    all_day_y = day_font / 2 + 2
+    all_day_h = day_font / 3
+    all_day_font = day_font * 0.8
+
+    # bound once, the loop below is run for every day of each overview
+    set_xy = doc.set_xy
+    set_font = doc.set_font
+    cell = doc.cell
+    get_bucket = events.get
+
+    cells = [
+        (
+            entry,
+            weekday_x[entry.weekday],
+            y + entry.week * ysize,
+            get_bucket(entry.date),
+        )
+        for entry in layout.days
+    ]
 
-    for day in range(1, 31 + 1):
-        try:
-            date = datetime.date(year, mon, day)
-        except Exception:
-            continue
-
-        weekday = date.weekday()
-        ymd = "%04d-%02d-%02d" % (year, mon, day)
-        link = links[ymd]
-
-        if weekday == 0 and day != 1:
-            week += 1
-
-        day_x = x + weekday * size
-        day_y = y + week * ysize
-
-        day_events: dict[str, list[DailyEvent]] = events.get(ymd, {})
-
+    # borders and holidays background are painted in one go, before
+    # any text; Each cell keeps its border then background order
+    rects: list[tuple[float, float, float, float, str]] = []
+    for entry, day_x, day_y, bucket in cells:
         if border:
-            doc.rect(day_x, day_y, size, ysize)
-
-        is_weekend: bool = (weekday in (5, 6))
-        is_holiday: bool = False
-        if not is_weekend:
-            for _, evs in day_events.items():
-                if any([ev.is_holiday() for ev in evs]):
-                    is_holiday = True
-                    break
-
-        if is_weekend or is_holiday:
-            doc.set_text_color(0)
-            doc.set_fill_color(*HOLYDAY_COLOR)
-            doc.rect(day_x, day_y, size, ysize, style=fpdf.enums.RenderStyle.F)
-
-        doc.set_xy(day_x, day_y)
-        doc.set_font(FONT, "B" if day  == highlighted_day else "", day_font)
-        doc.cell(
+            rects.append((day_x, day_y, size, ysize, "S"))
+        if entry.weekday >= 5 or (bucket and bucket.has_holiday):
+            rects.append((day_x, day_y, size, ysize, "f"))
+    __paint_rects(doc, rects)
+
+    for entry, day_x, day_y, bucket in cells:
+        day = entry.day
+        set_xy(day_x, day_y)
+        set_font(FONT, "B" if day == highlighted_day else "", day_font)
+        cell(
             w=size,
-            h=day_font / 2 + 1.5,
-            text="%d" % (day),
+            h=day_h,
+            text=entry.label,
             align="R",
-            link=link,
+            link=entry.link,
         )
 
         if not border:
             continue
-        if not day_events:
+        if not bucket:
             continue
 
-        doc.set_font(FONT, "", day_font * 0.8)
-        all_day = ""
-        for hms, evs in sorted(day_events.items()):
-            for ev in evs:
-                if hms != "00:00" or ev.duration != 0:
-                    # not an all day event
-                    continue
-                all_day += ev.title + "\n"
+        set_font(FONT, "", all_day_font)
+        all_day = bucket.all_day_text
         if all_day:
-            doc.set_xy(day_x + 1, day_y + day_font / 2 + 2)
-            doc.multi_cell(
-                w=size,
-                h=day_font / 3,
-                text=all_day,
-                align="L",
-            )
+            set_xy(day_x + 1, day_y + all_day_y)
+            __insert_text(doc, table, all_day, w=size, h=all_day_h, align="L")
 
 
 def __add_day_page(
     doc: FPDF,
-    year: int,
-    mon: int,
-    day: int,
-    links: dict[str, int],
-    events: dict[str, dict[str, list[DailyEvent]]],
+    table: CalendarTable,
+    layout: MonthLayout,
+    entry: DayEntry,
+    events: dict[datetime.date, DayBucket],
     *,
-    time_block_line_width: int,
-    time_block_line_color: int,
+    time_block_line_width: float,
+    time_block_line_color: float,
 ):
     """A full-page view on the given day.
 
     It contains an overview for the corresponding month."""
-    try:
-        date = datetime.date(year, mon, day)
-    except Exception:
-        return
-
-    ymd = "%04d-%02d-%02d" % (year, mon, day)
     doc.add_page()
-    doc.set_link(links[ymd])
+    doc.set_link(entry.link)
 
     cal_size = 8
     date_y = 0
@@ -293,11 +449,10 @@ def __add_day_page(
 
     __insert_month_overview(
         doc,
-        year,
-        mon,
-        links,
+        table,
+        layout,
         events,
-        highlighted_day=day,
+        highlighted_day=entry.day,
         highlighted_holidays=True,
         size=cal_size,
         x=cal_x,
@@ -309,23 +464,21 @@ def __add_day_page(
     doc.set_font(FONT, "B", 125)
     doc.set_xy(cal_x, date_y + 8)
     doc.cell(
-        text="%d" % (day),
+        text=entry.label,
         align="C",
         w=cal_w,
         h=50,
-        link=str(links["%04d-%02d" % (year, mon)]),
+        link=layout.link,
     )
 
     doc.set_font(FONT, "B", 26)
     doc.set_xy(cal_x, date_y)
     doc.cell(
-        text=FULLDAYS[date.weekday()],
+        text=table.full_day_names[entry.weekday],
         w=cal_w,
         h=15,
         align="C",
-        link=str(
-            links["%04d" % (year)],
-        ),
+        link=table.year_link,
     )
 
     # add the todo blocks
@@ -335,6 +488,7 @@ def __add_day_page(
     doc.set_text_color(40)
 
     line_height = PAGE_HEIGTH / 30
+    lines: list[tuple[float, float, float, float]] = []
     for i in range(1, 30):
         line_y = i * line_height + TOP_MARGIN
         if line_y > PAGE_HEIGTH - BOTTOM_MARGIN:
@@ -345,51 +499,47 @@ def __add_day_page(
         else:
             line_x = PAGE_WIDTH - RIGHT_MARGIN
 
-        doc.line(LEFT_MARGIN, line_y, line_x, line_y)
+        lines.append((LEFT_MARGIN, line_y, line_x, line_y))
+
+    __stroke_lines(doc, lines)
 
     # add prepopulated entries if there are any
-    if not (day_events := events.get(ymd)):
+    if not (bucket := events.get(entry.date)):
         return
 
-    all_day = ""
-
     doc.set_font(FONT, "", 10)
     line_x = cal_x - 8
 
-    for hms, evs in sorted(day_events.items()):
-        for ev in evs:
-            if hms == "00:00" and ev.duration == 0:
-                all_day += ev.title + "\n"
-                continue
+    all_day = bucket.all_day_text
 
     if all_day:
         doc.set_font(FONT, "B", 16)
         doc.set_xy(LEFT_MARGIN, TOP_MARGIN)
-        doc.multi_cell(
+        __insert_text(
+            doc,
+            table,
+            all_day,
             w=line_x - LEFT_MARGIN,
             h=line_height / 2,
-            text=all_day,
             align="C",
         )
 
 
 def add_year_page(
     doc: FPDF,
-    year: int,
-    links: dict[str, int],
-    events: dict[str, dict[str, list[DailyEvent]]],
+    table: CalendarTable,
+    events: dict[datetime.date, DayBucket],
 ):
     """A full-page view on given year.
 
     The page contains 12 month overviews."""
-    for mon in range(0, 12):
+    for mon, layout in enumerate(table.months):
         xsize = 9 * 7
         ysize = 9 * 7
         __insert_month_overview(
             doc,
-            year,
-            mon + 1,
-            links,
+            table,
+            layout,
             events,
             highlighted_day=None,
             highlighted_holidays=True,
@@ -401,49 +551,69 @@ def add_year_page(
         )
 
 
+def __add_month_pages(
+    doc: FPDF,
+    table: CalendarTable,
+    layout: MonthLayout,
+    events: dict[datetime.date, DayBucket],
+    *,
+    time_block_line_width: float,
+    time_block_line_color: float,
+):
+    """Add pages related to the given month.
+
+    The first page is a full-page overview of the month; Then, one
+    page per day is added."""
+    # month overview page
+    doc.add_page()
+    doc.set_link(layout.link)
+    __insert_month_overview(
+        doc,
+        table,
+        layout,
+        events,
+        highlighted_day=None,
+        highlighted_holidays=True,
+        size=(PAGE_WIDTH - LEFT_MARGIN) // 7,
+        x=LEFT_MARGIN,
+        y=0,
+        day_font=12,
+        border=True,
+        full_page=True,
+        ysize=36,
+    )
+
+    for entry in layout.days:
+        __add_day_page(
+            doc,
+            table,
+            layout,
+            entry,
+            events,
+            time_block_line_width=time_block_line_width,
+            time_block_line_color=time_block_line_color,
+        )
+
+
 def add_months_pages(
     doc: FPDF,
-    year: int,
-    links: dict[str, int],
-    events: dict[str, dict[str, list[DailyEvent]]],
+    table: CalendarTable,
+    events: dict[datetime.date, DayBucket],
     *,
-    time_block_line_width: int,
-    time_block_line_color: int,
+    time_block_line_width: float,
+    time_block_line_color: float,
 ):
     """Add pages related to all months.
 
     For each month, the first page is a full-page overview of the
     month; Then, one page per day is added."""
 
-    for mon in range(1, 12 + 1):
-        # month overview page
-        doc.add_page()
-        doc.set_link(links["%04d-%02d" % (year, mon)])
-        __insert_month_overview(
+    for layout in table.months:
+        __add_month_pages(
             doc,
-            year,
-            mon,
-            links,
+            table,
+            layout,
             events,
-            highlighted_day=None,
-            highlighted_holidays=True,
-            size=(PAGE_WIDTH - LEFT_MARGIN) // 7,
-            x=LEFT_MARGIN,
-            y=0,
-            day_font=12,
-            border=True,
-            full_page=True,
-            ysize=36,
+            time_block_line_width=time_block_line_width,
+            time_block_line_color=time_block_line_color,
         )
-
-        for day in range(1, 31 + 1):
-            __add_day_page(
-                doc,
-                year,
-                mon,
-                day,
-                links,
-                events,
-                time_block_line_width=time_block_line_width,
-                time_block_line_color=time_block_line_color,
-            )
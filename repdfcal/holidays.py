@@ -1,7 +1,7 @@
 import datetime
 from collections import defaultdict
 
-from .events import DailyEvent
+from .events import DayBucket
 
 from jours_feries_france import JoursFeries
 from vacances_scolaires_france import SchoolHolidayDates
@@ -9,7 +9,7 @@ from vacances_scolaires_france import SchoolHolidayDates
 
 def collect_french_holidays(
     year: int,
-    events: defaultdict[str, defaultdict[str, list[DailyEvent]]],
+    events: dict[datetime.date, DayBucket],
     school_zone: str | None,
     bank_zone: str | None,
 ):
@@ -25,34 +25,20 @@ def collect_french_holidays(
         for name, d in JoursFeries.for_year(year, bank_zone).items():
             bank_holidays[d].append(name)
 
-    timestamp_key = "00:00"
-    # means full day…
-
-    for mon in range(1, 12 + 1):
-        for day in range(1, 31 + 1):
-            try:
-                date = datetime.date(year, mon, day)
-            except (TypeError, ValueError):
+    if school_holidays:
+        for date, holiday in school_holidays.items():
+            if date.year != year:
                 continue
 
-            if school_holidays and date in school_holidays:
-                holiday = school_holidays[date]
-                date_key = date.isoformat()
-                events[date_key][timestamp_key].append(
-                    DailyEvent(
-                        datetime.datetime(date.year, date.month, date.day),
-                        0,
-                        holiday.get("nom_vacances", ""),
-                    )
-                )
-
-            if bank_holidays and date in bank_holidays:
-                date_key = date.isoformat()
-                for title in bank_holidays[date]:
-                    events[date_key][timestamp_key].append(
-                        DailyEvent(
-                            datetime.datetime(date.year, date.month, date.day),
-                            0,
-                            title,
-                        )
-                    )
+            bucket = events.get(date)
+            if bucket is None:
+                bucket = events[date] = DayBucket()
+            bucket.add_all_day(holiday.get("nom_vacances", ""), holiday=True)
+
+    if bank_holidays:
+        for date, titles in bank_holidays.items():
+            bucket = events.get(date)
+            if bucket is None:
+                bucket = events[date] = DayBucket()
+            for title in titles:
+                bucket.add_all_day(title, holiday=True)